@@ -1,21 +1,95 @@
 import subprocess
 import os
 import sys
+import atexit
+import queue
+import select
 import logging
+import logging.handlers
 import json
+import gzip
+import re
+import hashlib
 import shutil
+import signal
+import tempfile
+import threading
+import time
 from datetime import datetime
-from flask import Flask, request, jsonify, render_template_string, send_file
+from urllib.parse import urlsplit
+from concurrent.futures import Future
+import brotli
+import orjson
+from flask import Flask, Response, request, send_file, g
+from flask.json.provider import JSONProvider
+from flask_compress import Compress
 from werkzeug.utils import secure_filename
 
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, so jsonify() and request.json use it too."""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype='application/json')
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+
+# --- Response Compression ---
+# tito output and the docs page are repetitive text; compress anything non-trivial.
+app.config.update(
+    COMPRESS_ALGORITHM=['br', 'gzip'],
+    COMPRESS_MIMETYPES=['application/json', 'text/html'],
+    COMPRESS_MIN_SIZE=512,
+    # Responses are compressed per request, so favour speed; the docs page is precompressed at max level
+    COMPRESS_LEVEL=4,
+    COMPRESS_BR_LEVEL=4,
+    COMPRESS_STREAMS=False,  # streamed tito output must reach the client as it is produced
+)
+Compress(app)
 
 # --- Configure Logging ---
+# LOG_LEVEL=WARNING in production skips the per-request INFO records entirely.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+
+# The log format uses none of these record fields, so skip collecting them.
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+logging.raiseExceptions = False
+
+# Request threads only enqueue records; a listener thread does the actual
+# write to stderr, so a slow log drain can't stall a request.
+log_stream_handler = logging.StreamHandler()
+log_stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+log_listener = logging.handlers.QueueListener(
+    log_queue_handler.queue, log_stream_handler, respect_handler_level=True
+)
+log_listener.start()
+atexit.register(lambda: log_listener.stop())
+
+def _restart_log_listener():
+    """Give a forked child (e.g. a preloaded gunicorn worker) its own queue and listener thread."""
+    global log_listener
+    log_queue_handler.queue = queue.SimpleQueue()
+    log_listener = logging.handlers.QueueListener(
+        log_queue_handler.queue, log_stream_handler, respect_handler_level=True
+    )
+    log_listener.start()
+
+os.register_at_fork(after_in_child=_restart_log_listener)
+
 logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=LOG_LEVEL,
+    format='%(message)s',  # the queue handler only merges args; the stream handler adds the rest
     handlers=[
-        logging.StreamHandler(),
+        log_queue_handler,
     ]
 )
 logger = logging.getLogger(__name__)
@@ -30,6 +104,28 @@ ALLOWED_EXTENSIONS = {'ipynb'}
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(PROCESSED_FOLDER, exist_ok=True)
 
+# --- Allowed tito commands ---
+# Top-level tito verbs the API will run; anything else is rejected before a process is spawned.
+TITO_COMMANDS = (
+    'setup', 'system', 'module', 'dev', 'src', 'package', 'nbgrader', 'milestones',
+    'community', 'benchmark', 'olympics', 'export', 'test', 'grade', 'logo',
+)
+ALLOWED_TITO_COMMANDS = frozenset(TITO_COMMANDS + ('--version', '--help'))
+
+# Every argument must be a short plain token (module names, flags, key=value, paths)
+TITO_ARG_PATTERN = re.compile(r'[A-Za-z0-9._\-=/]{1,128}')
+TITO_MAX_ARGS = 32
+
+def valid_tito_args(args):
+    """True if args is a short list of plain string tokens."""
+    return len(args) <= TITO_MAX_ARGS and all(
+        isinstance(arg, str) and TITO_ARG_PATTERN.fullmatch(arg) for arg in args
+    )
+
+def valid_tito_name(value):
+    """True if value can be passed to tito as a module or assignment name (a plain token, not an option)."""
+    return valid_tito_args([value]) and not value.startswith('-')
+
 # --- Find tito executable ---
 def find_tito_executable():
     """Find the tito executable in various possible locations"""
@@ -41,83 +137,346 @@ def find_tito_executable():
         '/usr/local/bin/tito',
     ]
     
-    # Check which command
-    result = subprocess.run(['which', 'tito'], capture_output=True, text=True)
-    if result.returncode == 0:
-        tito_path = result.stdout.strip()
-        logger.info(f"Found tito via 'which': {tito_path}")
+    # Check PATH (same lookup as 'which', without forking it)
+    tito_path = shutil.which('tito')
+    if tito_path:
+        logger.info("Found tito on PATH: %s", tito_path)
         return tito_path
     
     # Check possible locations
     for location in possible_locations:
         if os.path.exists(location) and os.access(location, os.X_OK):
-            logger.info(f"Found tito at: {location}")
+            logger.info("Found tito at: %s", location)
             return location
     
     logger.warning("Could not find tito executable in any known location")
     return None
 
-# Find tito at startup
+# Find tito at startup; commands exec this absolute path, so PATH is never searched per call
 TITO_PATH = find_tito_executable()
 
+# Upper bound (seconds) for any tito command; requests may ask for less, never more.
+TITO_TIMEOUT = int(os.environ.get('TITO_TIMEOUT', 60))
+# Grace period between SIGTERM and SIGKILL when a command overruns its timeout.
+TITO_KILL_GRACE = 2
+
+def terminate_process_group(process):
+    """Stop a timed-out tito process and everything it spawned, then reap it."""
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.communicate(timeout=TITO_KILL_GRACE)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.communicate()
+    except ProcessLookupError:
+        process.communicate()
+
+# --- tito Process Environment ---
+# Resolved once at startup: none of these change while the service runs.
+TINYTORCH_PATH = next((path for path in ('/app/TinyTorch', '/app/tinytorch') if os.path.exists(path)), None)
+VENV_PYTHON = '/app/venv/bin/python' if os.path.exists('/app/venv/bin/python') else None
+# Working directory tito commands run in
+TITO_CWD = '/app/TinyTorch' if os.path.exists('/app/TinyTorch') else '/app'
+
+def build_tito_env():
+    """Environment for tito processes: ours, plus TinyTorch on PYTHONPATH and the venv Python."""
+    env = os.environ.copy()
+    
+    # Add TinyTorch to PYTHONPATH if it exists
+    if TINYTORCH_PATH:
+        current_pythonpath = env.get('PYTHONPATH', '')
+        if current_pythonpath:
+            env['PYTHONPATH'] = f"{TINYTORCH_PATH}:{current_pythonpath}"
+        else:
+            env['PYTHONPATH'] = TINYTORCH_PATH
+        logger.info("Added %s to PYTHONPATH", TINYTORCH_PATH)
+    
+    # Make sure we're using the venv Python
+    if VENV_PYTHON:
+        env['PYTHON'] = VENV_PYTHON
+    
+    return env
+
+# Shared by every tito process; never modified after this point
+TITO_ENV = build_tito_env()
+
+def run_tito_subprocess(command, timeout, env):
+    """Run tito as a new process and return (returncode, stdout, stderr)."""
+    # Own session so a timeout can kill tito together with any children it started.
+    # Output goes to temporary files rather than pipes: we only wait for the exit, never
+    # drain a pipe, and each stream is read and decoded once at the end (bad UTF-8 can't raise).
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        process = subprocess.Popen(
+            command,
+            stdout=out,
+            stderr=err,
+            env=env,
+            cwd=TITO_CWD,
+            start_new_session=True
+        )
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            terminate_process_group(process)
+            raise
+        
+        out.seek(0)
+        stdout = out.read().decode('utf-8', 'replace')
+        # stderr is only ever reported for failed commands
+        stderr = ''
+        if process.returncode:
+            err.seek(0)
+            stderr = err.read().decode('utf-8', 'replace')
+    return process.returncode, stdout, stderr
+
+# --- Persistent tito Workers ---
+# Each worker (tito_worker.py) imports tito once and then runs commands in-process,
+# so a command costs no fork/exec or interpreter and tito startup. Only read-only
+# commands run there: anything else may rewrite tinytorch sources a worker has already
+# imported, so it runs as a new tito process.
+TITO_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tito_worker.py')
+# Worker processes per server process (default: one per CPU, at most 4); 0 runs every
+# command as a new tito process
+TITO_WORKERS = int(os.environ.get('TITO_WORKERS', min(os.cpu_count() or 1, 4)))
+# Commands that may be running or waiting at once; past that a request fails fast as
+# busy instead of queueing until the proxy gives up on it
+TITO_MAX_PENDING = int(os.environ.get('TITO_MAX_PENDING', max(TITO_WORKERS, 1) * 8))
+# Seconds an admitted command may wait for a free worker or heavy-command slot before it
+# too is rejected as busy; the command's own timeout only starts once it runs
+TITO_QUEUE_TIMEOUT = int(os.environ.get('TITO_QUEUE_TIMEOUT', 10))
+# Workers are replaced after this many commands (bounding leaks in tito's process state)
+# and shut down after this many seconds unused
+TITO_WORKER_MAX_USES = int(os.environ.get('TITO_WORKER_MAX_USES', 100))
+TITO_WORKER_MAX_IDLE = int(os.environ.get('TITO_WORKER_MAX_IDLE', 300))
+# CPU-heavy commands (grading, tests, exports, benchmarks) that may run at once, so a burst
+# of them can't starve cheap commands and health checks of CPU. They never run in workers,
+# so workers stay free for cheap commands; the default leaves one CPU to those too.
+HEAVY_TITO_COMMANDS = (('grade',), ('test',), ('src', 'export'), ('export',), ('benchmark',))
+TITO_HEAVY_LIMIT = int(os.environ.get('TITO_HEAVY_LIMIT', max((os.cpu_count() or 1) - 1, 1)))
+
+_tito_workers_enabled = TITO_WORKERS > 0
+_idle_tito_workers = []
+_idle_tito_workers_lock = threading.Lock()
+_tito_worker_slots = threading.BoundedSemaphore(max(TITO_WORKERS, 1))
+_tito_admission = threading.BoundedSemaphore(TITO_MAX_PENDING)
+_tito_heavy_slots = threading.BoundedSemaphore(TITO_HEAVY_LIMIT)
+_tito_worker_stats = {"created": 0, "reused": 0, "recycled": 0}
+
+class TitoBusyError(RuntimeError):
+    """Raised instead of running a command when tito has no capacity left for it."""
+
+def acquire_heavy_slot(args, timeout):
+    """Wait for a heavy-command slot if args is a heavy command; returns the semaphore to release, or None.
+
+    Raises TitoBusyError if no slot frees up within timeout. Cached read-only commands
+    (e.g. grade --help) are never heavy.
+    """
+    if is_cacheable(tuple(args)):
+        return None
+    if not any(tuple(args[:len(prefix)]) == prefix for prefix in HEAVY_TITO_COMMANDS):
+        return None
+    slots = _tito_heavy_slots
+    if not slots.acquire(timeout=timeout):
+        raise TitoBusyError("tito is busy with other heavy commands. Try again shortly.")
+    return slots
+
+def _forget_tito_workers():
+    """Workers belong to the process that started them; a forked child starts its own."""
+    global _idle_tito_workers, _idle_tito_workers_lock, _tito_worker_slots, _tito_admission
+    global _tito_worker_stats, _tito_heavy_slots
+    _idle_tito_workers = []
+    _idle_tito_workers_lock = threading.Lock()
+    _tito_worker_slots = threading.BoundedSemaphore(max(TITO_WORKERS, 1))
+    _tito_admission = threading.BoundedSemaphore(TITO_MAX_PENDING)
+    _tito_worker_stats = {"created": 0, "reused": 0, "recycled": 0}
+    _tito_heavy_slots = threading.BoundedSemaphore(TITO_HEAVY_LIMIT)
+
+os.register_at_fork(after_in_child=_forget_tito_workers)
+
+def read_worker_reply(worker, deadline, timeout):
+    """Read one JSON line from a worker; None if it exited, TimeoutExpired past the deadline."""
+    fd = worker.stdout.fileno()
+    chunks = []
+    while not chunks or not chunks[-1].endswith(b'\n'):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+            raise subprocess.TimeoutExpired(worker.args, timeout)
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+    return orjson.loads(b''.join(chunks))
+
+def start_tito_worker(env, deadline, timeout):
+    """Start a worker and wait until it has imported tito; None if tito can't run in-process."""
+    worker = subprocess.Popen(
+        [sys.executable, TITO_WORKER_SCRIPT, TITO_PATH],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        env=env,
+        cwd=TITO_CWD,
+        start_new_session=True
+    )
+    try:
+        ready = read_worker_reply(worker, deadline, timeout)
+    except subprocess.TimeoutExpired:
+        terminate_process_group(worker)
+        raise
+    if ready is None:
+        worker.wait()
+        return None
+    logger.info("Started tito worker (pid %d)", worker.pid)
+    worker.uses = 0
+    with _idle_tito_workers_lock:
+        _tito_worker_stats["created"] += 1
+    return worker
+
+def retire_tito_worker(worker):
+    """Shut a worker down: closing its requests pipe ends its loop; kill it if it lingers."""
+    try:
+        worker.stdin.close()
+    except OSError:
+        pass
+    try:
+        worker.wait(timeout=TITO_KILL_GRACE)
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(worker.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        worker.wait()
+    worker.stdout.close()
+
+def retire_tito_workers(workers):
+    """Shut down each of a list of workers."""
+    for worker in workers:
+        retire_tito_worker(worker)
+
+def retire_idle_tito_workers():
+    """Retire idle workers that have exited or gone unused for TITO_WORKER_MAX_IDLE seconds.
+
+    They are shut down on a background thread, so a caller such as the health check never
+    waits out a worker's TITO_KILL_GRACE.
+    """
+    now = time.monotonic()
+    with _idle_tito_workers_lock:
+        stale = [worker for worker in _idle_tito_workers
+                 if worker.poll() is not None or now - worker.idle_since > TITO_WORKER_MAX_IDLE]
+        if stale:
+            _idle_tito_workers[:] = [worker for worker in _idle_tito_workers if worker not in stale]
+            _tito_worker_stats["recycled"] += len(stale)
+    if stale:
+        threading.Thread(target=retire_tito_workers, args=(stale,), daemon=True).start()
+
+def tito_worker_stats():
+    """Counts of workers created, reused and recycled by this server process, plus those idle now."""
+    with _idle_tito_workers_lock:
+        return {**_tito_worker_stats, "idle": len(_idle_tito_workers), "enabled": _tito_workers_enabled}
+
+def run_tito_in_worker(args, timeout, env):
+    """Run a command on an idle worker, starting one if needed.
+
+    Returns (returncode, stdout, stderr), or None if tito can't run in a worker.
+    Raises TitoBusyError if no worker frees up within TITO_QUEUE_TIMEOUT.
+    """
+    global _tito_workers_enabled
+    slots = _tito_worker_slots
+    if not slots.acquire(timeout=min(timeout, TITO_QUEUE_TIMEOUT)):
+        raise TitoBusyError("tito is busy with other commands. Try again shortly.")
+    deadline = time.monotonic() + timeout
+    try:
+        retire_idle_tito_workers()
+        worker = None
+        with _idle_tito_workers_lock:
+            if _idle_tito_workers:
+                worker = _idle_tito_workers.pop()
+                _tito_worker_stats["reused"] += 1
+        
+        if worker is None:
+            worker = start_tito_worker(env, deadline, timeout)
+            if worker is None:
+                logger.warning("tito cannot run in a persistent worker; starting a new process per command")
+                _tito_workers_enabled = False
+                return None
+        
+        try:
+            worker.stdin.write(orjson.dumps({"args": args}) + b'\n')
+            worker.stdin.flush()
+            reply = read_worker_reply(worker, deadline, timeout)
+        except subprocess.TimeoutExpired:
+            with _idle_tito_workers_lock:
+                _tito_worker_stats["recycled"] += 1
+            terminate_process_group(worker)
+            raise
+        except BrokenPipeError:
+            reply = None
+        
+        if reply is None:
+            # tito took the whole interpreter down with it (e.g. os._exit)
+            with _idle_tito_workers_lock:
+                _tito_worker_stats["recycled"] += 1
+            return worker.wait(), '', f"tito worker exited unexpectedly with code {worker.returncode}"
+        
+        worker.uses += 1
+        if worker.uses >= TITO_WORKER_MAX_USES:
+            with _idle_tito_workers_lock:
+                _tito_worker_stats["recycled"] += 1
+            retire_tito_worker(worker)
+        else:
+            worker.idle_since = time.monotonic()
+            with _idle_tito_workers_lock:
+                _idle_tito_workers.append(worker)
+        return reply['returncode'], reply['stdout'], reply['stderr']
+    finally:
+        slots.release()
+
 # --- Utility Function to Handle CLI Output ---
-def execute_tito_command(args):
-    """Executes a tito command and returns its stdout output or raises an error."""
+def run_tito_command(args, timeout=TITO_TIMEOUT):
+    """Runs a tito command (uncached) and returns its stdout output or raises an error."""
     
     if TITO_PATH is None:
         raise RuntimeError("tito executable not found. Check installation.")
     
+    admission = _tito_admission
+    if not admission.acquire(blocking=False):
+        logger.warning("Rejecting tito command: %d commands already running or queued", TITO_MAX_PENDING)
+        raise TitoBusyError("tito is busy with other commands. Try again shortly.")
+    
+    heavy = None
     try:
-        command = [TITO_PATH] + args
-        logger.info(f"Executing tito command: {' '.join(command)}")
+        command = (TITO_PATH, *args)
+        heavy = acquire_heavy_slot(args, min(timeout, TITO_QUEUE_TIMEOUT))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Executing tito command: %s", ' '.join(command))
         
-        # Set up environment to help Python find modules
-        env = os.environ.copy()
+        env = TITO_ENV
+        in_worker = _tito_workers_enabled and is_cacheable(tuple(args))
+        result = run_tito_in_worker(args, timeout, env) if in_worker else None
+        if result is None:
+            result = run_tito_subprocess(command, timeout, env)
+        returncode, stdout, stderr = result
         
-        # Add TinyTorch to PYTHONPATH if it exists
-        tinytorch_paths = ['/app/TinyTorch', '/app/tinytorch']
-        for path in tinytorch_paths:
-            if os.path.exists(path):
-                current_pythonpath = env.get('PYTHONPATH', '')
-                if current_pythonpath:
-                    env['PYTHONPATH'] = f"{path}:{current_pythonpath}"
-                else:
-                    env['PYTHONPATH'] = path
-                logger.info(f"Added {path} to PYTHONPATH")
-                break
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, command, stdout, stderr)
         
-        # Make sure we're using the venv Python
-        if os.path.exists('/app/venv/bin/python'):
-            env['PYTHON'] = '/app/venv/bin/python'
-        
-        result = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            check=True,
-            timeout=60,
-            env=env,
-            cwd='/app/TinyTorch' if os.path.exists('/app/TinyTorch') else '/app'
-        )
-        
-        logger.info(f"Command succeeded. Output length: {len(result.stdout)} chars")
-        return result.stdout.strip()
+        logger.info("Command succeeded. Output length: %d chars", len(stdout))
+        return stdout.strip()
     
     except subprocess.CalledProcessError as e:
         error_message = f"tito command failed. STDERR: {e.stderr.strip()}"
         logger.error(error_message)
-        logger.error(f"STDOUT: {e.stdout.strip()}")
-        logger.error(f"Exit code: {e.returncode}")
+        logger.error("STDOUT: %s", e.stdout.strip())
+        logger.error("Exit code: %s", e.returncode)
         
         # Try to provide helpful debugging info
-        logger.error(f"Command was: {' '.join(command)}")
-        logger.error(f"Working directory: {os.getcwd()}")
-        logger.error(f"PYTHONPATH: {env.get('PYTHONPATH', 'Not set')}")
+        logger.error("Command was: %s", ' '.join(command))
+        logger.error("Working directory: %s", os.getcwd())
+        logger.error("PYTHONPATH: %s", env.get('PYTHONPATH', 'Not set'))
         
         raise RuntimeError(error_message) 
     
-    except subprocess.TimeoutExpired as e:
-        error_message = f"tito command timed out after 60 seconds"
+    except subprocess.TimeoutExpired:
+        error_message = f"tito command timed out after {timeout} seconds"
         logger.error(error_message)
         raise RuntimeError(error_message)
     
@@ -125,6 +484,263 @@ def execute_tito_command(args):
         error_message = "The 'tito' command was not found. Check Dockerfile and PATH."
         logger.error(error_message)
         raise RuntimeError(error_message)
+    
+    finally:
+        if heavy is not None:
+            heavy.release()
+        admission.release()
+
+# --- Coalesced In-flight Commands ---
+# Identical read-only commands that arrive while one is already running (e.g. several
+# docs pages pressing the same button) wait for that run instead of starting another.
+# Anything else (grading, module complete/reset, exports) runs every time it is asked for.
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+def run_tito_command_once(args, timeout):
+    """Runs a tito command, sharing the result with concurrent callers of the same command."""
+    key = (tuple(args), timeout)
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = _in_flight[key] = Future()
+    if not leader:
+        return future.result()
+    
+    try:
+        output = run_tito_command(args, timeout)
+    except BaseException as e:
+        with _in_flight_lock:
+            del _in_flight[key]
+        future.set_exception(e)
+        raise
+    with _in_flight_lock:
+        del _in_flight[key]
+    future.set_result(output)
+    return output
+
+# --- Cached Read-only Commands ---
+# Read-only commands (the docs page's Quick Commands) are answered from memory.
+# Anything ending in --help or --version only changes when tito is upgraded and is
+# kept for TITO_CACHE_TTL seconds; listings of the environment and modules for
+# TITO_LISTING_CACHE_TTL. A failure is remembered briefly so it isn't retried per click.
+STATIC_TITO_COMMANDS = frozenset({
+    ('--version',), ('--help',), ('logo',), ('test', '--help'), ('grade', '--help'), ('export', '--help'),
+})
+LISTING_TITO_COMMANDS = frozenset({
+    ('system', 'info'), ('system', 'doctor'), ('module', 'list'),
+})
+CACHEABLE_TITO_COMMANDS = STATIC_TITO_COMMANDS | LISTING_TITO_COMMANDS
+TITO_CACHE_TTL = int(os.environ.get('TITO_CACHE_TTL', 300))
+TITO_LISTING_CACHE_TTL = int(os.environ.get('TITO_LISTING_CACHE_TTL', 30))
+TITO_NEGATIVE_CACHE_TTL = 5
+TITO_CACHE_SIZE = 256
+
+_tito_cache = {}  # args tuple -> (expiry on the monotonic clock, output, error message)
+
+def is_cacheable(args):
+    """Whether a tito args tuple is read-only and safe to answer from the cache."""
+    return args in CACHEABLE_TITO_COMMANDS or (bool(args) and args[-1] in ('--help', '--version'))
+
+def remember_tito_output(args, ttl, output, error=None):
+    """Cache a command's output (or its error message) for ttl seconds."""
+    if len(_tito_cache) >= TITO_CACHE_SIZE:
+        _tito_cache.clear()
+    _tito_cache[args] = (time.monotonic() + ttl, output, error)
+
+def cached_tito_command(args, timeout):
+    """Runs a read-only tito command, reusing its output (or failure) until it expires."""
+    entry = _tito_cache.get(args)
+    if entry is not None and entry[0] > time.monotonic():
+        if entry[2] is not None:
+            raise RuntimeError(entry[2])
+        return entry[1]
+    
+    try:
+        output = run_tito_command_once(list(args), timeout)
+    except TitoBusyError:
+        raise
+    except RuntimeError as e:
+        remember_tito_output(args, TITO_NEGATIVE_CACHE_TTL, None, str(e))
+        raise
+    ttl = TITO_LISTING_CACHE_TTL if args in LISTING_TITO_COMMANDS else TITO_CACHE_TTL
+    remember_tito_output(args, ttl, output)
+    return output
+
+def clear_tito_cache():
+    """Forget all cached command output."""
+    _tito_cache.clear()
+
+def execute_tito_command(args, timeout=TITO_TIMEOUT):
+    """Executes a tito command and returns its stdout output or raises an error."""
+    key = tuple(args)
+    if is_cacheable(key):
+        return cached_tito_command(key, timeout)
+    try:
+        return run_tito_command(args, timeout)
+    finally:
+        # Anything else may have changed what the cached commands would print (e.g. module list)
+        clear_tito_cache()
+
+# --- Streamed tito Output ---
+# Otherwise a Python tito block-buffers its output into the pipe
+TITO_STREAM_ENV = {**TITO_ENV, 'PYTHONUNBUFFERED': '1'}
+
+def start_streamed_tito(args):
+    """Start tito as a new process whose combined stdout/stderr can be read as it is written."""
+    return subprocess.Popen(
+        (TITO_PATH, *args),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        env=TITO_STREAM_ENV,
+        cwd=TITO_CWD,
+        start_new_session=True
+    )
+
+# Long-running commands GET /api/v1/tito/stream will run (for the docs page's EventSource).
+# Any page can trigger a GET (e.g. with an <img> tag), so that route also refuses
+# cross-site requests before starting anything; other commands must be POSTed.
+SSE_TITO_COMMANDS = (('grade',), ('src', 'export'), ('export',))
+
+# Seconds of silence after which an event stream gets a comment line, so proxies keep it open
+SSE_HEARTBEAT_INTERVAL = int(os.environ.get('SSE_HEARTBEAT_INTERVAL', 15))
+
+def tito_output_chunks(process, deadline, heartbeat=None):
+    """Yield a streamed tito process's output until EOF or the deadline; b'' after each heartbeat seconds of silence."""
+    fd = process.stdout.fileno()
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        wait = remaining if heartbeat is None else min(remaining, heartbeat)
+        if not select.select([fd], [], [], wait)[0]:
+            if wait < remaining:
+                yield b''
+                continue
+            return
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            return
+        yield chunk
+
+def finish_streamed_tito(process, deadline, timeout):
+    """Wait for a streamed tito process to exit; its return code, or None if it had to be killed at the deadline."""
+    try:
+        return process.wait(timeout=max(deadline - time.monotonic(), 0))
+    except subprocess.TimeoutExpired:
+        terminate_process_group(process)
+        logger.error("Streamed tito command timed out after %s seconds", timeout)
+        return None
+
+def stream_tito_output(process, timeout):
+    """Yield a streamed tito process's output as plain text as it arrives, then a final status line."""
+    deadline = time.monotonic() + timeout
+    yield from tito_output_chunks(process, deadline)
+    returncode = finish_streamed_tito(process, deadline, timeout)
+    if returncode is None:
+        yield f"\n[tito command timed out after {timeout} seconds]\n".encode()
+    else:
+        yield f"\n[tito exited with code {returncode}]\n".encode()
+
+def sse_event(event, data):
+    """One Server-Sent Event with a JSON payload."""
+    return b'event: ' + event + b'\ndata: ' + orjson.dumps(data) + b'\n\n'
+
+def stream_tito_events(process, timeout):
+    """Yield a streamed tito process's output as Server-Sent Events: one progress event per line, then done."""
+    deadline = time.monotonic() + timeout
+    pending = b''
+    for chunk in tito_output_chunks(process, deadline, SSE_HEARTBEAT_INTERVAL):
+        if not chunk:
+            yield b': keepalive\n\n'
+            continue
+        *lines, pending = (pending + chunk).split(b'\n')
+        if lines:
+            yield b''.join(sse_event(b'progress', {"line": line.decode('utf-8', 'replace')}) for line in lines)
+    if pending:
+        yield sse_event(b'progress', {"line": pending.decode('utf-8', 'replace')})
+    
+    returncode = finish_streamed_tito(process, deadline, timeout)
+    yield sse_event(b'done', {"returncode": returncode, "timed_out": returncode is None})
+
+# --- Cached tito Health Probe ---
+# How long (seconds) a `tito --version` probe result is reused by the health check
+TITO_PROBE_INTERVAL = 60
+
+def probe_tito():
+    """Check that tito is executable and get its version (forks `tito --version` once)."""
+    tito_available = TITO_PATH is not None
+    tito_executable = False
+    tito_version = None
+    tito_error = None
+    
+    if tito_available:
+        tito_executable = os.access(TITO_PATH, os.X_OK)
+        
+        # Try to get version
+        try:
+            version_result = subprocess.run(
+                [TITO_PATH, '--version'], 
+                capture_output=True, 
+                env=TITO_ENV,
+                cwd=TITO_CWD,
+                timeout=5
+            )
+            if version_result.returncode == 0:
+                tito_version = version_result.stdout.decode('utf-8', 'replace').strip()
+                # Same output a ['--version'] command would return, so answer that from here too
+                remember_tito_output(('--version',), TITO_CACHE_TTL, tito_version)
+            else:
+                tito_error = version_result.stderr.decode('utf-8', 'replace').strip()
+        except Exception as e:
+            logger.warning("Could not get tito version: %s", e)
+            tito_error = str(e)
+    
+    return {
+        "tito_found": tito_available,
+        "tito_executable": tito_executable,
+        "tito_version": tito_version,
+        "tito_error": tito_error,
+    }
+
+_tito_probe = probe_tito()
+_tito_probe_checked_at = time.monotonic()
+_tito_probe_lock = threading.Lock()
+
+def get_tito_probe():
+    """Return the cached tito probe, re-running it at most once per TITO_PROBE_INTERVAL."""
+    global _tito_probe, _tito_probe_checked_at
+    if time.monotonic() - _tito_probe_checked_at >= TITO_PROBE_INTERVAL:
+        with _tito_probe_lock:
+            # Another thread may have refreshed it while we waited for the lock
+            if time.monotonic() - _tito_probe_checked_at >= TITO_PROBE_INTERVAL:
+                _tito_probe = probe_tito()
+                _tito_probe_checked_at = time.monotonic()
+    return _tito_probe
+
+_health_json = (None, b'')
+
+def get_health_json():
+    """Return the health response serialized up to its trailing tito_workers value.
+
+    Re-serialized only when the tito probe is refreshed; callers append the
+    worker stats, the request's timestamp and the closing brace.
+    """
+    global _health_json
+    probe = get_tito_probe()
+    cached_probe, body = _health_json
+    if cached_probe is not probe:
+        body = orjson.dumps({
+            "status": "healthy",
+            "service": "TinyTorch API",
+            "tito_path": TITO_PATH,
+            **probe,
+            "available_commands": ", ".join(TITO_COMMANDS),
+        })[:-1] + b',"tito_workers":'
+        _health_json = (probe, body)
+    return body
 
 # --- Notebook Processing Functions ---
 def allowed_file(filename):
@@ -304,8 +920,8 @@ API_DOCS_HTML = """
     <hr>
 
     <!-- Grade Operations -->
-    <h2>POST /api/v1/grade</h2>
-    <p>Grade assignments and tests.</p>
+    <h2>POST /api/v1/grade, GET /api/v1/tito/stream</h2>
+    <p>Grade assignments and tests. <code>POST /api/v1/grade</code> with <code>{"assignment": "..."}</code> returns the output once grading finishes. The button below streams the same command as Server-Sent Events from <code>GET /api/v1/tito/stream?args=...</code> as tito prints it; that route only runs grade and export commands (<code>POST /api/v1/tito/stream</code> with a JSON body streams any command as plain text).</p>
     <label for="assignment-name">Assignment Name:</label>
     <input type="text" id="assignment-name" value="01_tensor" size="30">
     <br><br>
@@ -457,6 +1073,38 @@ API_DOCS_HTML = """
             loading.style.display = show ? 'inline' : 'none';
         }
 
+        function streamCommand(args, elementId, loadingId) {
+            showLoading(loadingId, true);
+            const container = document.getElementById(elementId);
+            const textarea = document.createElement('textarea');
+            textarea.rows = 10;
+            textarea.cols = 80;
+            textarea.readOnly = true;
+            container.appendChild(textarea);
+            container.appendChild(document.createElement('br'));
+            
+            const query = args.map(arg => 'args=' + encodeURIComponent(arg)).join('&');
+            return new Promise(resolve => {
+                const source = new EventSource(baseUrl + '/api/v1/tito/stream?' + query);
+                function finish(message) {
+                    // Close explicitly: EventSource would otherwise reconnect and run the command again
+                    source.close();
+                    textarea.value += message;
+                    showLoading(loadingId, false);
+                    resolve();
+                }
+                source.addEventListener('progress', event => {
+                    textarea.value += JSON.parse(event.data).line + '\\n';
+                    textarea.scrollTop = textarea.scrollHeight;
+                });
+                source.addEventListener('done', event => {
+                    const result = JSON.parse(event.data);
+                    finish(result.timed_out ? '[tito command timed out]' : '[tito exited with code ' + result.returncode + ']');
+                });
+                source.onerror = () => finish('[stream failed: check the command, or try again if tito is busy]');
+            });
+        }
+
         async function testHealth() {
             showLoading('health-loading', true);
             const result = await makeRequest('/api/v1/health');
@@ -485,7 +1133,8 @@ API_DOCS_HTML = """
             } else if (operation === 'info') {
                 args = ['module', 'info', moduleName];
             } else if (operation === 'export') {
-                args = ['src', 'export', moduleName];
+                await streamCommand(['src', 'export', moduleName], 'module-response', 'module-loading');
+                return;
             }
             
             showLoading('module-loading', true);
@@ -505,14 +1154,7 @@ API_DOCS_HTML = """
                 return;
             }
             
-            showLoading('grade-loading', true);
-            const result = await makeRequest('/api/v1/tito/command', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ args: ['grade', 'autograde', assignmentName] })
-            });
-            showLoading('grade-loading', false);
-            showResponse('grade-response', result);
+            await streamCommand(['grade', 'autograde', assignmentName], 'grade-response', 'grade-loading');
         }
 
         async function testCustomCommand() {
@@ -539,12 +1181,161 @@ API_DOCS_HTML = """
 </html>
 """
 
+def minify_html(html):
+    """Drop HTML comments, indentation, blank lines and whole-line // comments from the docs page."""
+    html = re.sub(r'<!--.*?-->', '', html, flags=re.DOTALL)
+    lines = (line.strip() for line in html.splitlines())
+    # Newlines are kept so JavaScript's automatic semicolon insertion still applies
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+# The docs page has no template variables, so minify, encode and compress it once at import
+API_DOCS_BODY = minify_html(API_DOCS_HTML).encode('utf-8')
+API_DOCS_ENCODED = {
+    'br': brotli.compress(API_DOCS_BODY, quality=11),
+    'gzip': gzip.compress(API_DOCS_BODY, compresslevel=9),
+    'identity': API_DOCS_BODY,
+}
+API_DOCS_ETAG = hashlib.blake2b(API_DOCS_BODY, digest_size=8).hexdigest()
+# The page only changes with this file, so its mtime is the same in every worker
+API_DOCS_LAST_MODIFIED = int(os.path.getmtime(__file__))
+# Browsers and any CDN in front of the service may reuse the page without asking again;
+# after that the ETag makes revalidation a 304.
+API_DOCS_MAX_AGE = int(os.environ.get('API_DOCS_MAX_AGE', 3600))
+
+# --- Per-request Timestamp ---
+_timestamp_cache = (0, '')
+
+def utc_timestamp():
+    """Current UTC time as an ISO 8601 string with one-second resolution, formatted at most once a second."""
+    global _timestamp_cache
+    second = int(time.time())
+    cached_second, timestamp = _timestamp_cache
+    if second != cached_second:
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(second))
+        _timestamp_cache = (second, timestamp)
+    return timestamp
+
+@app.before_request
+def stamp_request():
+    """Compute the response timestamp once per request."""
+    g.timestamp = utc_timestamp()
+
+def json_response(payload, status=200):
+    """Serialize a payload with orjson into a JSON response."""
+    return Response(orjson.dumps(payload), status=status, mimetype='application/json')
+
+# --- Static Error Responses ---
+# Bodies for errors that never vary are serialized once here (they carry no timestamp).
+def error_body(message, **extra):
+    return orjson.dumps({"status": "error", "message": message, **extra})
+
+ERROR_BAD_JSON = error_body("Request body must be a JSON object")
+ERROR_MISSING_ARGS = error_body(
+    "Missing 'args' parameter. Send JSON with 'args' array.",
+    example={"args": ["system", "info"]}
+)
+ERROR_ARGS_NOT_LIST = error_body("'args' must be an array of strings")
+ERROR_UNKNOWN_COMMAND = error_body(
+    f"Unknown tito command. Allowed: {', '.join(sorted(ALLOWED_TITO_COMMANDS))}"
+)
+ERROR_BAD_ARGS = error_body(
+    f"Each arg must be 1-128 characters of letters, digits and ._-=/ (at most {TITO_MAX_ARGS} args)"
+)
+ERROR_NOT_STREAMABLE = error_body(
+    "GET /api/v1/tito/stream only runs grade and export commands; POST other commands"
+)
+ERROR_CROSS_SITE = error_body("GET /api/v1/tito/stream only accepts requests from this site")
+ERROR_BAD_TIMEOUT = error_body("'timeout' must be a positive number of seconds")
+ERROR_MISSING_ASSIGNMENT = error_body("Missing 'assignment' parameter")
+ERROR_TITO_NOT_FOUND = error_body("tito executable not found. Check installation.")
+ERROR_TITO_BUSY = error_body("tito is busy with other commands. Try again shortly.")
+ERROR_NOT_FOUND = error_body("Endpoint not found. Visit / for API documentation.")
+ERROR_INTERNAL = error_body("Internal server error. Check logs for details.")
+
+def error_response(body, status):
+    """Response for a pre-serialized error body."""
+    return Response(body, status=status, mimetype='application/json')
+
+def read_json_body():
+    """Parse a JSON request body with orjson; None if there is none. Raises ValueError for anything but a JSON object.
+
+    Like get_json(silent=True), a body not sent as JSON is ignored, so a cross-site
+    form or text/plain POST (which skips the CORS preflight) can't carry a command.
+    """
+    if not request.is_json:
+        return None
+    body = request.get_data(cache=False)
+    if not body:
+        return None
+    data = orjson.loads(body)
+    if not isinstance(data, dict):
+        raise ValueError("JSON body is not an object")
+    return data
+
+def read_tito_command_request():
+    """Validate an {"args": [...], "timeout": n} body; returns (args, timeout, None) or (None, None, error response)."""
+    try:
+        data = read_json_body()
+    except ValueError:
+        return None, None, error_response(ERROR_BAD_JSON, 400)
+    return validate_tito_command(data)
+
+def read_tito_command_query():
+    """Validate ?args=...&args=...&timeout=n query parameters, like read_tito_command_request."""
+    data = {}
+    if 'args' in request.args:
+        data['args'] = request.args.getlist('args')
+    if 'timeout' in request.args:
+        data['timeout'] = request.args.get('timeout', type=float)
+    return validate_tito_command(data)
+
+def is_cross_site_request():
+    """True if a browser sent this request on behalf of another site.
+
+    Uses Sec-Fetch-Site where the browser sends it, else compares Origin (or Referer) with
+    our host; requests with neither (e.g. curl) are not cross-site.
+    """
+    site = request.headers.get('Sec-Fetch-Site')
+    if site is not None:
+        return site not in ('same-origin', 'none')
+    source = request.headers.get('Origin') or request.referrer
+    return source is not None and urlsplit(source).netloc != request.host
+
+def validate_tito_command(data):
+    """Check the args and optional timeout of a tito command request."""
+    if not data or 'args' not in data:
+        return None, None, error_response(ERROR_MISSING_ARGS, 400)
+    
+    args = data['args']
+    if not isinstance(args, list):
+        return None, None, error_response(ERROR_ARGS_NOT_LIST, 400)
+    
+    if not args or not isinstance(args[0], str) or args[0] not in ALLOWED_TITO_COMMANDS:
+        return None, None, error_response(ERROR_UNKNOWN_COMMAND, 400)
+    
+    if not valid_tito_args(args):
+        return None, None, error_response(ERROR_BAD_ARGS, 400)
+    
+    timeout = data.get('timeout', TITO_TIMEOUT)
+    if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or not timeout > 0:
+        return None, None, error_response(ERROR_BAD_TIMEOUT, 400)
+    return args, min(timeout, TITO_TIMEOUT), None
+
 # --- API Endpoints (ALL ORIGINAL PRESERVED) ---
 
 @app.route('/', methods=['GET'])
 def api_documentation():
     """Serves the interactive API documentation page."""
-    return render_template_string(API_DOCS_HTML)
+    encoding = request.accept_encodings.best_match(('br', 'gzip'), default='identity')
+    response = Response(API_DOCS_ENCODED[encoding], mimetype='text/html')
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(f"{API_DOCS_ETAG}-{encoding}")
+    response.last_modified = API_DOCS_LAST_MODIFIED
+    response.cache_control.public = True
+    response.cache_control.max_age = API_DOCS_MAX_AGE
+    return response.make_conditional(request)
 
 
 @app.route('/api/v1/health', methods=['GET'])
@@ -552,93 +1343,80 @@ def health_check():
     """Health check endpoint to verify service is running."""
     logger.info("Health check requested")
     
-    tito_available = TITO_PATH is not None
-    tito_executable = False
-    tito_version = None
-    tito_error = None
-    
-    if tito_available:
-        tito_executable = os.access(TITO_PATH, os.X_OK)
-        
-        # Try to get version
-        try:
-            version_result = subprocess.run(
-                [TITO_PATH, '--version'], 
-                capture_output=True, 
-                text=True, 
-                timeout=5,
-                env=os.environ.copy()
-            )
-            if version_result.returncode == 0:
-                tito_version = version_result.stdout.strip()
-            else:
-                tito_error = version_result.stderr.strip()
-        except Exception as e:
-            logger.warning(f"Could not get tito version: {e}")
-            tito_error = str(e)
-    
-    return jsonify({
-        "status": "healthy",
-        "service": "TinyTorch API",
-        "tito_path": TITO_PATH,
-        "tito_found": tito_available,
-        "tito_executable": tito_executable,
-        "tito_version": tito_version,
-        "tito_error": tito_error,
-        "available_commands": "setup, system, module, dev, src, package, nbgrader, milestones, community, benchmark, olympics, export, test, grade, logo",
-        "timestamp": datetime.utcnow().isoformat()
-    })
+    # Health probes arrive regularly even when no commands do, so sweep idle workers here too
+    # (without waiting for them to exit)
+    retire_idle_tito_workers()
+    body = (get_health_json() + orjson.dumps(tito_worker_stats())
+            + b',"timestamp":' + orjson.dumps(g.timestamp) + b'}')
+    return Response(body, mimetype='application/json')
 
 
-@app.route('/api/v1/module', methods=['GET', 'POST'])
-def module_operations():
-    """Handle module operations."""
-    logger.info(f"Module endpoint called via {request.method}")
-    
-    data = request.get_json(silent=True)
-    if data is None:
-        data = request.args
+# operation -> (needs a module name, builder for the tito args)
+MODULE_OPERATIONS = {
+    'list': (False, lambda module: ['module', 'list']),
+    'info': (True, lambda module: ['module', 'info', module]),
+    'export': (True, lambda module: ['src', 'export', module]),
+}
+
+@app.route('/api/v1/module', methods=['GET'])
+def module_operations_get():
+    """Handle module operations given as query parameters."""
+    logger.info("Module endpoint called via GET")
+    return module_dispatch(request.args)
+
+
+@app.route('/api/v1/module', methods=['POST'])
+def module_operations_post():
+    """Handle module operations given as a JSON body (or query parameters if there is no body)."""
+    logger.info("Module endpoint called via POST")
     
+    try:
+        data = read_json_body()
+    except ValueError:
+        return error_response(ERROR_BAD_JSON, 400)
+    return module_dispatch(request.args if data is None else data)
+
+
+def module_dispatch(data):
+    """Run the module operation described by data."""
     operation = data.get('operation', 'list')
     module_name = data.get('module')
     
+    spec = MODULE_OPERATIONS.get(operation) if isinstance(operation, str) else None
+    if spec is None:
+        return json_response({
+            "status": "error",
+            "message": f"Unknown operation: {operation}"
+        }, 400)
+    
+    needs_module, build_args = spec
+    if needs_module and not module_name:
+        return json_response({
+            "status": "error",
+            "message": f"Module name required for {operation} operation"
+        }, 400)
+    if needs_module and not valid_tito_name(module_name):
+        return error_response(ERROR_BAD_ARGS, 400)
+    
     try:
-        if operation == 'list':
-            output = execute_tito_command(['module', 'list'])
-        elif operation == 'info':
-            if not module_name:
-                return jsonify({
-                    "status": "error",
-                    "message": "Module name required for info operation"
-                }), 400
-            output = execute_tito_command(['module', 'info', module_name])
-        elif operation == 'export':
-            if not module_name:
-                return jsonify({
-                    "status": "error",
-                    "message": "Module name required for export operation"
-                }), 400
-            output = execute_tito_command(['src', 'export', module_name])
-        else:
-            return jsonify({
-                "status": "error",
-                "message": f"Unknown operation: {operation}"
-            }), 400
+        output = execute_tito_command(build_args(module_name))
         
-        return jsonify({
+        return json_response({
             "status": "success",
             "operation": operation,
             "output": output,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": g.timestamp
         })
         
+    except TitoBusyError:
+        return error_response(ERROR_TITO_BUSY, 503)
     except RuntimeError as e:
-        logger.error(f"Module operation failed: {e}")
-        return jsonify({
+        logger.error("Module operation failed: %s", e)
+        return json_response({
             "status": "error",
             "message": str(e),
-            "timestamp": datetime.utcnow().isoformat()
-        }), 500
+            "timestamp": g.timestamp
+        }, 500)
 
 
 @app.route('/api/v1/grade', methods=['POST'])
@@ -646,30 +1424,34 @@ def grade_assignment():
     """Grade an assignment."""
     logger.info("Grade endpoint called")
     
-    data = request.get_json(silent=True)
+    try:
+        data = read_json_body()
+    except ValueError:
+        return error_response(ERROR_BAD_JSON, 400)
     if not data or 'assignment' not in data:
-        return jsonify({
-            "status": "error",
-            "message": "Missing 'assignment' parameter"
-        }), 400
+        return error_response(ERROR_MISSING_ASSIGNMENT, 400)
     
     assignment = data['assignment']
+    if not valid_tito_name(assignment):
+        return error_response(ERROR_BAD_ARGS, 400)
     
     try:
         output = execute_tito_command(['grade', 'autograde', assignment])
-        return jsonify({
+        return json_response({
             "status": "success",
             "assignment": assignment,
             "output": output,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": g.timestamp
         })
+    except TitoBusyError:
+        return error_response(ERROR_TITO_BUSY, 503)
     except RuntimeError as e:
-        logger.error(f"Grading failed: {e}")
-        return jsonify({
+        logger.error("Grading failed: %s", e)
+        return json_response({
             "status": "error",
             "message": str(e),
-            "timestamp": datetime.utcnow().isoformat()
-        }), 500
+            "timestamp": g.timestamp
+        }, 500)
 
 
 @app.route('/api/v1/tito/command', methods=['POST'])
@@ -677,41 +1459,99 @@ def execute_custom_tito_command():
     """Execute arbitrary tito commands."""
     logger.info("Custom tito command endpoint called")
     
-    data = request.get_json(silent=True)
-    if not data or 'args' not in data:
-        return jsonify({
-            "status": "error",
-            "message": "Missing 'args' parameter. Send JSON with 'args' array.",
-            "example": {"args": ["system", "info"]},
-            "timestamp": datetime.utcnow().isoformat()
-        }), 400
+    args, timeout, error = read_tito_command_request()
+    if error is not None:
+        return error
     
-    args = data['args']
-    if not isinstance(args, list):
-        return jsonify({
-            "status": "error",
-            "message": "'args' must be an array of strings",
-            "timestamp": datetime.utcnow().isoformat()
-        }), 400
-    
-    logger.info(f"Executing custom tito command: {args}")
+    logger.info("Executing custom tito command: %s", args)
     
     try:
-        output = execute_tito_command(args)
-        return jsonify({
+        output = execute_tito_command(args, timeout=timeout)
+        return json_response({
             "status": "success",
             "command": args,
             "output": output,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": g.timestamp
         })
+    except TitoBusyError:
+        return error_response(ERROR_TITO_BUSY, 503)
     except RuntimeError as e:
-        logger.error(f"Custom command failed: {e}")
-        return jsonify({
+        logger.error("Custom command failed: %s", e)
+        return json_response({
             "status": "error",
             "message": str(e),
             "command": args,
-            "timestamp": datetime.utcnow().isoformat()
-        }), 500
+            "timestamp": g.timestamp
+        }, 500)
+
+
+def streamed_tito_response(args, timeout, render, mimetype):
+    """Start a tito command as its own process and return a response streaming render(process, timeout)."""
+    if TITO_PATH is None:
+        return error_response(ERROR_TITO_NOT_FOUND, 500)
+    
+    admission = _tito_admission
+    if not admission.acquire(blocking=False):
+        return error_response(ERROR_TITO_BUSY, 503)
+    try:
+        heavy = acquire_heavy_slot(args, min(timeout, TITO_QUEUE_TIMEOUT))
+    except TitoBusyError:
+        admission.release()
+        return error_response(ERROR_TITO_BUSY, 503)
+    try:
+        process = start_streamed_tito(args)
+    except OSError as e:
+        if heavy is not None:
+            heavy.release()
+        admission.release()
+        logger.error("Could not start streamed tito command: %s", e)
+        return error_response(ERROR_TITO_NOT_FOUND, 500)
+    
+    logger.info("Streaming tito command: %s", args)
+    
+    def finish():
+        # Runs when the response is closed, including when the client disconnects early
+        if process.poll() is None:
+            terminate_process_group(process)
+        process.stdout.close()
+        if heavy is not None:
+            heavy.release()
+        admission.release()
+        if not is_cacheable(tuple(args)):
+            clear_tito_cache()
+    
+    response = Response(render(process, timeout), mimetype=mimetype)
+    response.call_on_close(finish)
+    return response
+
+
+@app.route('/api/v1/tito/stream', methods=['POST'])
+def stream_custom_tito_command():
+    """Execute a tito command and stream its output as plain text while it runs."""
+    logger.info("Streaming tito command endpoint called")
+    
+    args, timeout, error = read_tito_command_request()
+    if error is not None:
+        return error
+    return streamed_tito_response(args, timeout, stream_tito_output, 'text/plain')
+
+
+@app.route('/api/v1/tito/stream', methods=['GET'])
+def stream_custom_tito_command_events():
+    """Execute a tito command and stream its output as Server-Sent Events (for EventSource)."""
+    logger.info("Streaming tito command endpoint called via GET")
+    
+    if is_cross_site_request():
+        return error_response(ERROR_CROSS_SITE, 403)
+    args, timeout, error = read_tito_command_query()
+    if error is not None:
+        return error
+    if not any(tuple(args[:len(prefix)]) == prefix for prefix in SSE_TITO_COMMANDS):
+        return error_response(ERROR_NOT_STREAMABLE, 400)
+    response = streamed_tito_response(args, timeout, stream_tito_events, 'text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 
 # --- NEW ENDPOINTS: Notebook Processing ---
@@ -722,15 +1562,15 @@ def process_notebook():
     logger.info("Notebook processing endpoint called")
     
     if 'file' not in request.files:
-        return jsonify({'success': False, 'message': 'No file provided'}), 400
+        return json_response({'success': False, 'message': 'No file provided'}, 400)
     
     file = request.files['file']
     
     if file.filename == '':
-        return jsonify({'success': False, 'message': 'No file selected'}), 400
+        return json_response({'success': False, 'message': 'No file selected'}, 400)
     
     if not allowed_file(file.filename):
-        return jsonify({'success': False, 'message': 'Invalid file type. Only .ipynb allowed'}), 400
+        return json_response({'success': False, 'message': 'Invalid file type. Only .ipynb allowed'}, 400)
     
     # Save uploaded file
     filename = secure_filename(file.filename)
@@ -739,72 +1579,66 @@ def process_notebook():
     filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
     file.save(filepath)
     
-    logger.info(f"Saved uploaded notebook: {filepath}")
+    logger.info("Saved uploaded notebook: %s", filepath)
     
     # Extract module number
     module_number = extract_module_number(filename)
     if not module_number:
-        return jsonify({
+        return json_response({
             'success': False, 
             'message': 'Could not determine module number. Use format like 01_tensor.ipynb'
-        }), 400
+        }, 400)
     
     # Process with tito
     success, output, processed_path = run_tito_complete(filepath, module_number)
     
     if processed_path:
         result_filename = os.path.basename(processed_path)
-        return jsonify({
+        return json_response({
             'success': success,
             'message': 'Notebook processed' if success else 'Processing completed with errors',
             'module_number': module_number,
             'output': output,
             'result_file': result_filename,
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': g.timestamp
         })
     else:
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'Processing failed',
             'output': output,
-            'timestamp': datetime.utcnow().isoformat()
-        }), 500
+            'timestamp': g.timestamp
+        }, 500)
 
 
 @app.route('/api/v1/notebook/download/<filename>')
 def download_notebook(filename):
     """Download processed notebook"""
-    logger.info(f"Download requested for: {filename}")
+    logger.info("Download requested for: %s", filename)
     filepath = os.path.join(PROCESSED_FOLDER, filename)
     if os.path.exists(filepath):
         return send_file(filepath, as_attachment=True)
-    return jsonify({'error': 'File not found'}), 404
+    return json_response({'error': 'File not found'}, 404)
 
 
 # --- Error Handlers (ORIGINAL PRESERVED) ---
 @app.errorhandler(404)
 def not_found(error):
-    logger.warning(f"404 error: {request.url}")
-    return jsonify({
-        "status": "error",
-        "message": "Endpoint not found. Visit / for API documentation.",
-        "timestamp": datetime.utcnow().isoformat()
-    }), 404
+    logger.warning("404 error: %s", request.url)
+    return error_response(ERROR_NOT_FOUND, 404)
 
 
 @app.errorhandler(500)
 def internal_error(error):
-    logger.error(f"500 error: {error}")
-    return jsonify({
-        "status": "error",
-        "message": "Internal server error. Check logs for details.",
-        "timestamp": datetime.utcnow().isoformat()
-    }), 500
+    logger.error("500 error: %s", error)
+    return error_response(ERROR_INTERNAL, 500)
 
 
 # --- Local Runner ---
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    logger.info(f"Starting Flask app on port {port}")
-    logger.info(f"Tito path: {TITO_PATH}")
-    app.run(host='0.0.0.0', port=port, debug=True)
+    logger.info("Starting Flask app on port %s", port)
+    logger.info("Tito path: %s", TITO_PATH)
+    # FLASK_DEBUG=1 turns on the Werkzeug debugger and reloader for local development
+    debug = os.environ.get('FLASK_DEBUG', '0') == '1'
+    app.run(host='0.0.0.0', port=port, debug=debug)
@@ -7,6 +7,8 @@ Run this in your Docker container to see what's available
 import os
 import sys
 import subprocess
+from collections import deque
+from itertools import islice
 from pathlib import Path
 
 def check_command(cmd):
@@ -23,15 +25,18 @@ def check_module(module_name):
         return False, str(e)
 
 def find_files(pattern, search_paths):
-    """Find files matching a pattern in given paths"""
-    found = []
-    for path in search_paths:
-        if os.path.exists(path):
-            for root, dirs, files in os.walk(path):
-                for file in files:
-                    if pattern in file:
-                        found.append(os.path.join(root, file))
-    return found
+    """Yield files matching a pattern in given paths, breadth-first; stop iterating to stop the walk"""
+    queue = deque(path for path in search_paths if path and os.path.isdir(path))
+    while queue:
+        try:
+            with os.scandir(queue.popleft()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        queue.append(entry.path)
+                    elif pattern in entry.name:
+                        yield entry.path
+        except OSError:
+            continue
 
 def main():
     print("=" * 70)
@@ -82,13 +87,13 @@ def main():
     # Search for tito files
     print("\n6. Searching for tito-related files:")
     search_paths = ['/app', '/app/TinyTorch', '/usr/local', os.environ.get('VIRTUAL_ENV', '')]
-    tito_files = find_files('tito', search_paths)
-    if tito_files:
-        for f in tito_files[:10]:  # Limit to first 10
-            print(f"   {f}")
-        if len(tito_files) > 10:
-            print(f"   ... and {len(tito_files) - 10} more")
-    else:
+    shown = 0
+    for shown, f in enumerate(islice(find_files('tito', search_paths), 11), 1):
+        if shown > 10:  # Limit to first 10; the 11th only tells us there are more
+            print("   ... and more")
+            break
+        print(f"   {f}")
+    if not shown:
         print("   No files found")
     
     # Check TinyTorch directory structure
@@ -0,0 +1,21 @@
+# --- Gunicorn configuration for the TinyTorch API ---
+# Used by the Dockerfile: gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 10000)}"
+
+# Threaded workers: requests mostly wait on tito with the GIL released, and
+# gthread (unlike sync) keeps client connections alive between requests.
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+keepalive = 30
+timeout = 120
+
+# Import app.py once in the master: the docs page is encoded/compressed and tito
+# is probed once, then shared copy-on-write with every worker.
+# (tito worker processes are started lazily, per gunicorn worker, after the fork.)
+preload_app = True
+
+# Worker heartbeat files on tmpfs so a slow container disk can't stall workers
+worker_tmp_dir = '/dev/shm'
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Long-lived tito worker used by app.py.
+
+Loads the tito CLI once, then runs one command per JSON line read from stdin
+and answers each with one JSON line on stdout:
+
+    -> {"args": ["module", "list"]}
+    <- {"returncode": 0, "stdout": "...", "stderr": "..."}
+
+The first line written is {"ready": true}, sent once tito has been loaded: an
+installed tito package is imported up front, while a plain tito script is only
+run (and makes its own imports) when the first command arrives. If tito cannot
+be loaded in-process the worker exits instead, and app.py falls back to running
+the tito executable directly.
+
+Usage: python tito_worker.py /path/to/tito
+"""
+
+import json
+import os
+import runpy
+import sys
+import tempfile
+import traceback
+from importlib.metadata import entry_points
+
+def load_tito(tito_path):
+    """Return a callable that runs tito with the current sys.argv"""
+    # Installed package: call the same function the console script calls
+    for entry_point in entry_points(group='console_scripts', name='tito'):
+        return entry_point.load()
+
+    # Plain Python script (e.g. TinyTorch/bin/tito): re-run it as __main__
+    with open(tito_path, 'rb') as f:
+        shebang = f.readline()
+    if shebang.startswith(b'#!') and b'python' in shebang:
+        def run():
+            # run_path returns the script's globals, which exit_code would take for an error
+            runpy.run_path(tito_path, run_name='__main__')
+        return run
+
+    raise RuntimeError(f"{tito_path} is not a Python entry point")
+
+def exit_code(value):
+    """Map a return value or SystemExit code to a process exit status, like sys.exit does"""
+    if value is None:
+        return 0
+    if isinstance(value, int):
+        return value
+    print(value, file=sys.stderr)
+    return 1
+
+def run_command(run_tito, args):
+    """Run one tito command in-process, capturing everything written to fds 1 and 2"""
+    cwd = os.getcwd()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        saved_stdout, saved_stderr = os.dup(1), os.dup(2)
+        os.dup2(out.fileno(), 1)
+        os.dup2(err.fileno(), 2)
+        sys.argv = ['tito', *args]
+        try:
+            try:
+                returncode = exit_code(run_tito())
+            except SystemExit as e:
+                returncode = exit_code(e.code)
+            except Exception:
+                traceback.print_exc()
+                returncode = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved_stdout, 1)
+            os.dup2(saved_stderr, 2)
+            os.close(saved_stdout)
+            os.close(saved_stderr)
+            os.chdir(cwd)
+
+        out.seek(0)
+        err.seek(0)
+        return {
+            "returncode": returncode,
+            "stdout": out.read().decode('utf-8', 'replace'),
+            "stderr": err.read().decode('utf-8', 'replace'),
+        }
+
+def main():
+    tito_path = sys.argv[1]
+
+    # Keep private copies of the request/response pipes, then point fds 0 and 1
+    # elsewhere so tito can neither read our requests nor corrupt our replies
+    requests = os.fdopen(os.dup(0), 'r', encoding='utf-8')
+    replies = os.fdopen(os.dup(1), 'w', encoding='utf-8')
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+    os.dup2(2, 1)
+
+    try:
+        run_tito = load_tito(tito_path)
+    except Exception as e:
+        print(f"tito worker: cannot load tito in-process: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    replies.write(json.dumps({"ready": True}) + '\n')
+    replies.flush()
+
+    for line in requests:
+        result = run_command(run_tito, json.loads(line)['args'])
+        replies.write(json.dumps(result) + '\n')
+        replies.flush()
+
+if __name__ == '__main__':
+    main()